@@ -1,8 +1,9 @@
 import os
+import re
 import json
 import requests
-from datetime import datetime
-from flask import Flask, request, jsonify, render_template_string
+from datetime import datetime, date
+from flask import Flask, request, jsonify, render_template_string, Response
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
@@ -16,77 +17,445 @@ from email.mime.base import MIMEBase
 from email import encoders
 import io
 import uuid
+import time
+import threading
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
+# Installer licence details are read-only on the form, so a renewal is a
+# config change and an expired licence is flagged to ops, not technicians
+INSTALLER_CONTRACTOR_LICENSE_NO = os.environ.get('INSTALLER_CONTRACTOR_LICENSE_NO', '292339C')
+INSTALLER_CONTRACTOR_EXPIRY_DATE = os.environ.get('INSTALLER_CONTRACTOR_EXPIRY_DATE', '2027-02-02')
+
 # In-memory session storage (use database in production)
 sessions = {}
+# Guards draft version checks so concurrent autosaves can't interleave
+sessions_lock = threading.Lock()
+
+WORK_CARRIED_OUT_OPTIONS = [
+    'New Work', 'Installed Meter', 'Network connection', 'Addition/alteration to existing',
+    'Install Advanced Meter', 'EV Connection', 'Re-inspection of non-compliant work'
+]
+SPECIAL_CONDITION_OPTIONS = [
+    'Over 100 amps', 'Hazardous Area', 'Off Grid Installation', 'High Voltage',
+    'Unmetered Supply', 'Secondary Power Supply'
+]
+
+# Patterns are kept to syntax that means the same in Python and JavaScript,
+# since the form page runs the same rules before submitting
+POSTCODE_PATTERN = r'\d{4}'
+NMI_PATTERN = r'[A-Za-z0-9]{10,11}'
+EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+
+# Declarative CCEW field rules. Supported keys: label, required, pattern
+# (full match) with message, date, not_expired, multiple (checkbox lists)
+# with min_items, and choices. read_only fields come from the prefill (SimPro
+# or config) and can't be set by the form; every field a client may send is
+# listed here, even when it has no rules.
+CCEW_FIELD_SCHEMA = {
+    # Installation Address
+    'serialNo': {'label': 'Serial No', 'required': True, 'read_only': True},
+    'propertyName': {'label': 'Property Name', 'required': True, 'read_only': True},
+    'floor': {'label': 'Floor'},
+    'unit': {'label': 'Unit'},
+    'streetNumber': {'label': 'Street Number', 'required': True},
+    'streetName': {'label': 'Street Name', 'required': True},
+    'suburb': {'label': 'Suburb', 'required': True},
+    'state': {'label': 'State', 'required': True, 'read_only': True},
+    'postCode': {'label': 'Post Code', 'required': True, 'pattern': POSTCODE_PATTERN, 'message': 'must be 4 digits'},
+    'pitPillarPoleNumber': {'label': 'Pit/Pillar/Pole Number'},
+    'nmi': {'label': 'NMI', 'pattern': NMI_PATTERN, 'message': 'must be 10 or 11 letters or digits'},
+    'meterNumber': {'label': 'Meter Number'},
+    'aemoMeteringProviderId': {'label': 'AEMO Metering Provider ID', 'required': True},
+
+    # Customer Details
+    'customerFirstName': {'label': 'Customer First Name', 'required': True},
+    'customerLastName': {'label': 'Customer Last Name', 'required': True},
+    'customerCompanyName': {'label': 'Customer Company Name', 'read_only': True},
+    'customerFloor': {'label': 'Customer Floor'},
+    'customerUnit': {'label': 'Customer Unit'},
+    'customerStreetNumber': {'label': 'Customer Street Number', 'required': True},
+    'customerStreetName': {'label': 'Customer Street Name', 'required': True},
+    'customerSuburb': {'label': 'Customer Suburb', 'required': True},
+    'customerState': {'label': 'Customer State', 'required': True},
+    'customerPostCode': {'label': 'Customer Post Code', 'required': True, 'pattern': POSTCODE_PATTERN, 'message': 'must be 4 digits'},
+    'customerEmail': {'label': 'Customer Email', 'pattern': EMAIL_PATTERN, 'message': 'must be a valid email address'},
+    'customerOfficeNo': {'label': 'Customer Office Number'},
+    'customerMobileNo': {'label': 'Customer Mobile Number'},
+
+    # Installation Details
+    'installationType': {
+        'label': 'Type of Installation', 'required': True,
+        'choices': ['Residential', 'Commercial', 'Industrial', 'Rural', 'Mixed Development']
+    },
+    'workCarriedOut': {'label': 'Work Carried Out', 'multiple': True, 'min_items': 1, 'choices': WORK_CARRIED_OUT_OPTIONS},
+    'nonComplianceNo': {'label': 'Non-Compliance Number'},
+    'specialConditions': {'label': 'Special Conditions', 'multiple': True, 'choices': SPECIAL_CONDITION_OPTIONS},
+
+    # Installer License Details (config, see installer_license_expired)
+    'installerFirstName': {'label': 'Installer First Name', 'read_only': True},
+    'installerLastName': {'label': 'Installer Last Name', 'read_only': True},
+    'installerStreetNumber': {'label': 'Installer Street Number', 'read_only': True},
+    'installerStreetName': {'label': 'Installer Street Name', 'read_only': True},
+    'installerSuburb': {'label': 'Installer Suburb', 'read_only': True},
+    'installerState': {'label': 'Installer State', 'read_only': True},
+    'installerPostCode': {'label': 'Installer Post Code', 'read_only': True},
+    'installerEmail': {'label': 'Installer Email', 'read_only': True},
+    'installerOfficeNo': {'label': 'Installer Office Number', 'read_only': True},
+    'installerContractorLicenseNo': {'label': 'Installer Contractor License Number', 'read_only': True},
+    'installerContractorExpiryDate': {'label': 'Installer License Expiry Date', 'read_only': True},
+
+    # Tester License Details
+    'testerFirstName': {'label': 'Tester First Name', 'required': True},
+    'testerLastName': {'label': 'Tester Last Name', 'required': True},
+    'testerStreetNumber': {'label': 'Tester Street Number', 'read_only': True},
+    'testerStreetName': {'label': 'Tester Street Name', 'read_only': True},
+    'testerSuburb': {'label': 'Tester Suburb', 'read_only': True},
+    'testerState': {'label': 'Tester State', 'read_only': True},
+    'testerPostCode': {'label': 'Tester Post Code', 'read_only': True},
+    'testerEmail': {'label': 'Tester Email', 'read_only': True},
+    'testerOfficeNo': {'label': 'Tester Office Number', 'read_only': True},
+    'testerContractorLicenseNo': {'label': 'Tester Contractor License Number', 'required': True},
+    'testerContractorExpiryDate': {'label': 'Tester License Expiry Date', 'required': True, 'date': True, 'not_expired': True},
+    'testCompletedDate': {'label': 'Test Completion Date', 'required': True, 'date': True},
+
+    # Submit CCEW
+    'energyProvider': {
+        'label': 'Energy Provider', 'required': True,
+        'choices': ['Ausgrid', 'Endeavour Energy', 'Essential Energy']
+    },
+    'meterProviderEmail': {'label': 'Meter Provider Email', 'pattern': EMAIL_PATTERN, 'message': 'must be a valid email address'},
+    'ownerEmail': {'label': 'Owner Email', 'pattern': EMAIL_PATTERN, 'message': 'must be a valid email address'},
+    'certificationStatement': {'label': 'Certification Statement', 'required': True},
+}
+
+def _compile_field(name, rules):
+    """Build a check function for one field; it returns an error message or None"""
+    label = rules.get('label', name)
+    required = rules.get('required', False)
+    pattern = re.compile(rules['pattern']) if 'pattern' in rules else None
+    pattern_error = f"{label} {rules.get('message', 'is not in a valid format')}"
+    date_pattern = re.compile(DATE_PATTERN) if rules.get('date') else None
+    not_expired = rules.get('not_expired', False)
+    min_items = rules.get('min_items')
+    choices = frozenset(rules['choices']) if 'choices' in rules else None
+
+    if rules.get('multiple'):
+        def check(value):
+            if value is None:
+                value = []
+            if not isinstance(value, list):
+                return f"{label} must be a list"
+            if min_items and len(value) < min_items:
+                return f"{label} requires at least {min_items} selection" + ('s' if min_items > 1 else '')
+            if choices is not None:
+                for item in value:
+                    if not isinstance(item, str):
+                        return f"{label} has an invalid option"
+                    if item not in choices:
+                        return f"{label} has an invalid option: {item}"
+            return None
+        return check
+
+    def check(value):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return f"{label} is required" if required else None
+        if not isinstance(value, str):
+            return f"{label} must be text"
+        value = value.strip()
+        if choices is not None and value not in choices:
+            return f"{label} must be one of: {', '.join(sorted(choices))}"
+        if pattern is not None and not pattern.fullmatch(value):
+            return pattern_error
+        if date_pattern is not None:
+            try:
+                parsed = date.fromisoformat(value) if date_pattern.fullmatch(value) else None
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                return f"{label} must be a date (YYYY-MM-DD)"
+            if not_expired and parsed < date.today():
+                return f"{label} has expired"
+        return None
+    return check
+
+def compile_validator(schema):
+    """Compile a field schema into a function returning {field: error} for a submission"""
+    checks = tuple((name, _compile_field(name, rules)) for name, rules in schema.items())
+
+    def validate(data):
+        errors = {}
+        for name, check in checks:
+            error = check(data.get(name))
+            if error:
+                errors[name] = error
+        return errors
+    return validate
+
+def client_validation_rules(schema):
+    """Subset of the schema the form page needs to run the same checks in the browser"""
+    return {
+        name: {key: rules[key] for key in ('label', 'required', 'pattern', 'message', 'date', 'not_expired', 'multiple', 'min_items', 'choices') if key in rules}
+        for name, rules in schema.items()
+    }
+
+validate_ccew = compile_validator(CCEW_FIELD_SCHEMA)
+CCEW_CLIENT_RULES = client_validation_rules(CCEW_FIELD_SCHEMA)
+READ_ONLY_FIELDS = frozenset(name for name, rules in CCEW_FIELD_SCHEMA.items() if rules.get('read_only'))
+MULTIPLE_FIELDS = frozenset(name for name, rules in CCEW_FIELD_SCHEMA.items() if rules.get('multiple'))
+
+def check_form_fields(fields):
+    """Return {field: error} for fields a client may not send or values of the wrong type"""
+    errors = {}
+    for name, value in fields.items():
+        if name not in CCEW_FIELD_SCHEMA:
+            errors[name] = f"Unknown field: {name}"
+        elif name in READ_ONLY_FIELDS:
+            errors[name] = f"{CCEW_FIELD_SCHEMA[name]['label']} cannot be changed"
+        elif name in MULTIPLE_FIELDS:
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                errors[name] = f"{CCEW_FIELD_SCHEMA[name]['label']} must be a list of text values"
+        elif not isinstance(value, str):
+            errors[name] = f"{CCEW_FIELD_SCHEMA[name]['label']} must be text"
+    return errors
+
+def installer_license_expired():
+    """True if the configured installer licence expiry is missing, malformed or past"""
+    try:
+        return date.fromisoformat(INSTALLER_CONTRACTOR_EXPIRY_DATE) < date.today()
+    except ValueError:
+        return True
+
+if installer_license_expired():
+    app.logger.warning("Installer contractor licence expiry %r is invalid or past; set INSTALLER_CONTRACTOR_EXPIRY_DATE",
+                       INSTALLER_CONTRACTOR_EXPIRY_DATE)
 
 @app.route('/')
 def index():
     return jsonify({
         "status": "online",
         "service": "CCEW API",
-        "version": "2.0"
+        "version": "2.0",
+        "installer_license_expired": installer_license_expired()
     })
 
+def build_prefilled_data(simpro_data):
+    """Extract and pre-fill available CCEW fields from SimPro job data"""
+    return {
+        # Serial Number (Job ID)
+        'serialNo': str(simpro_data.get('job_id', '')),
+        
+        # Installation Address
+        'propertyName': simpro_data.get('site_address', ''),
+        'state': 'NSW',
+        
+        # Customer Details
+        'customerCompanyName': simpro_data.get('customer_name', ''),
+        'customerFirstName': simpro_data.get('customer_first_name', ''),
+        'customerLastName': simpro_data.get('customer_last_name', ''),
+        
+        # Installer License Details (hardcoded for Karl Knopp)
+        'installerFirstName': 'Karl',
+        'installerLastName': 'Knopp',
+        'installerStreetNumber': '177',
+        'installerStreetName': 'Bringelly Road',
+        'installerSuburb': 'Leppington',
+        'installerState': 'NSW',
+        'installerPostCode': '2179',
+        'installerEmail': 'admin@proformelec.com.au',
+        'installerOfficeNo': '47068270',
+        'installerContractorLicenseNo': INSTALLER_CONTRACTOR_LICENSE_NO,
+        'installerContractorExpiryDate': INSTALLER_CONTRACTOR_EXPIRY_DATE,
+        
+        # Tester License Details (from technician + hardcoded)
+        'testerFirstName': simpro_data.get('technician_first_name', simpro_data.get('technician_name', '').split()[0] if simpro_data.get('technician_name') else ''),
+        'testerLastName': simpro_data.get('technician_last_name', ' '.join(simpro_data.get('technician_name', '').split()[1:]) if simpro_data.get('technician_name') and len(simpro_data.get('technician_name', '').split()) > 1 else ''),
+        'testerStreetNumber': '177',
+        'testerStreetName': 'Bringelly Road',
+        'testerSuburb': 'Leppington',
+        'testerState': 'NSW',
+        'testerPostCode': '2179',
+        'testerEmail': 'admin@proformelec.com.au',
+        'testerOfficeNo': '47068270',
+        'testerContractorLicenseNo': simpro_data.get('technician_license_number', ''),
+        'testerContractorExpiryDate': simpro_data.get('technician_license_expiry', ''),
+    }
+
+# Latest form session for each SimPro job, so techs can look a job's form up
+# and later webhooks refresh that pending form instead of creating another
+job_sessions = {}
+
+def create_session(simpro_data):
+    """Create a form session pre-filled from SimPro job data and return its ID"""
+    session_id = str(uuid.uuid4())
+    sessions[session_id] = {
+        'simpro_data': simpro_data,
+        'prefilled_data': build_prefilled_data(simpro_data),
+        'draft': {},
+        'draft_version': 0,
+        'created_at': datetime.now().isoformat(),
+        'status': 'pending'
+    }
+    if simpro_data.get('job_id'):
+        job_sessions[str(simpro_data['job_id'])] = session_id
+    return session_id
+
+def prefill_job_session(job_id, simpro_data):
+    """Refresh the job's pending form session from SimPro data, creating one if needed"""
+    with sessions_lock:
+        session_data = sessions.get(job_sessions.get(job_id))
+        if session_data and session_data['status'] == 'pending':
+            session_data['simpro_data'] = simpro_data
+            session_data['prefilled_data'] = build_prefilled_data(simpro_data)
+            return job_sessions[job_id]
+    return create_session(simpro_data)
+
+class WebhookQueue:
+    """Append-only local queue of SimPro webhook events, coalesced per job.
+
+    Events are written to a JSON-lines file before they are acknowledged and
+    replayed from it when the queue is created. A background consumer waits until a job has
+    been quiet for the debounce window (or max_delay since its first event)
+    and then calls handler once with the latest payload. The file is emptied
+    whenever nothing is pending.
+    """
+
+    def __init__(self, path, handler, debounce_seconds=5.0, max_delay_seconds=30.0):
+        self.path = path
+        self.handler = handler
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.pending = {}  # job_id -> [latest payload, first seen, last seen]
+        self.cond = threading.Condition()
+        self.log = None
+        self.consumer = None
+        self._recover()
+
+    def _recover(self):
+        if not os.path.exists(self.path):
+            return
+        now = time.monotonic()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                    self.pending[str(event['job_id'])] = [event['payload'], now, now]
+                except (ValueError, KeyError, TypeError):
+                    continue  # partial line from a crash mid-write, or not an event
+        if self.pending:
+            self._ensure_consumer()
+
+    def _ensure_consumer(self):
+        if self.consumer is None or not self.consumer.is_alive():
+            self.consumer = threading.Thread(target=self._consume, name='webhook-consumer', daemon=True)
+            self.consumer.start()
+
+    def _open_log(self):
+        # Terminate a line torn by a crash so the next event isn't glued onto it
+        torn = False
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+        log = open(self.path, 'a', encoding='utf-8')
+        if torn:
+            log.write('\n')
+        return log
+
+    def is_pending(self, job_id):
+        """True if events for the job are waiting to be processed"""
+        with self.cond:
+            return job_id in self.pending
+
+    def append(self, job_id, payload):
+        """Durably record an event and wake the consumer"""
+        line = json.dumps({'job_id': job_id, 'payload': payload}) + '\n'
+        now = time.monotonic()
+        with self.cond:
+            if self.log is None:
+                self.log = self._open_log()
+            # Flushed to the OS so it survives a process crash; no fsync,
+            # which would cost milliseconds per webhook
+            self.log.write(line)
+            self.log.flush()
+            entry = self.pending.get(job_id)
+            if entry:
+                entry[0] = payload
+                entry[2] = now
+            else:
+                self.pending[job_id] = [payload, now, now]
+            self._ensure_consumer()
+            self.cond.notify()
+
+    def _take_due(self):
+        """Wait for jobs whose debounce window has closed and remove them from pending"""
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                due = []
+                wait = None
+                for job_id, (payload, first_seen, last_seen) in self.pending.items():
+                    ready_at = min(last_seen + self.debounce_seconds, first_seen + self.max_delay_seconds)
+                    if ready_at <= now:
+                        due.append(job_id)
+                    elif wait is None or ready_at - now < wait:
+                        wait = ready_at - now
+                if due:
+                    return [(job_id, self.pending.pop(job_id)[0]) for job_id in due]
+                self.cond.wait(wait)
+
+    def _consume(self):
+        while True:
+            for job_id, payload in self._take_due():
+                try:
+                    self.handler(job_id, payload)
+                except Exception:
+                    app.logger.exception("Webhook prefill failed for job %s", job_id)
+            with self.cond:
+                # Everything recorded so far has been handled
+                if not self.pending:
+                    if self.log is not None:
+                        self.log.close()
+                        self.log = None
+                    open(self.path, 'w').close()
+
+# Created on first use or at worker boot (start_webhook_queue), never at
+# import, so importing the app (tests, benchmarks, tooling) never replays the
+# queue file or starts the consumer
+webhook_queue = None
+webhook_queue_lock = threading.Lock()
+
+def webhook_queue_path():
+    return os.environ.get('WEBHOOK_QUEUE_PATH', 'webhook_queue.jsonl')
+
+def start_webhook_queue():
+    """Start the queue at boot if its file holds events left from before a restart"""
+    path = webhook_queue_path()
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        get_webhook_queue()
+
+def get_webhook_queue():
+    """Return the webhook queue, creating it and replaying its file on first use"""
+    global webhook_queue
+    if webhook_queue is None:
+        with webhook_queue_lock:
+            if webhook_queue is None:
+                webhook_queue = WebhookQueue(
+                    webhook_queue_path(),
+                    prefill_job_session,
+                    debounce_seconds=float(os.environ.get('WEBHOOK_DEBOUNCE_SECONDS', '5')),
+                    max_delay_seconds=float(os.environ.get('WEBHOOK_MAX_DELAY_SECONDS', '30'))
+                )
+    return webhook_queue
+
 @app.route('/api/ccew/generate', methods=['POST'])
 def generate_ccew():
     """Generate a new CCEW form session from SimPro job data"""
     try:
         simpro_data = request.json
-        
-        # Create unique session ID
-        session_id = str(uuid.uuid4())
-        
-        # Extract and pre-fill available fields from SimPro
-        prefilled_data = {
-            # Serial Number (Job ID)
-            'serialNo': str(simpro_data.get('job_id', '')),
-            
-            # Installation Address
-            'propertyName': simpro_data.get('site_address', ''),
-            
-            # Customer Details
-            'customerCompanyName': simpro_data.get('customer_name', ''),
-            'customerFirstName': simpro_data.get('customer_first_name', ''),
-            'customerLastName': simpro_data.get('customer_last_name', ''),
-            
-            # Installer License Details (hardcoded for Karl Knopp)
-            'installerFirstName': 'Karl',
-            'installerLastName': 'Knopp',
-            'installerStreetNumber': '177',
-            'installerStreetName': 'Bringelly Road',
-            'installerSuburb': 'Leppington',
-            'installerState': 'NSW',
-            'installerPostCode': '2179',
-            'installerEmail': 'admin@proformelec.com.au',
-            'installerOfficeNo': '47068270',
-            'installerContractorLicenseNo': '292339C',
-            'installerContractorExpiryDate': '2027-02-02',
-            
-            # Tester License Details (from technician + hardcoded)
-            'testerFirstName': simpro_data.get('technician_first_name', simpro_data.get('technician_name', '').split()[0] if simpro_data.get('technician_name') else ''),
-            'testerLastName': simpro_data.get('technician_last_name', ' '.join(simpro_data.get('technician_name', '').split()[1:]) if simpro_data.get('technician_name') and len(simpro_data.get('technician_name', '').split()) > 1 else ''),
-            'testerStreetNumber': '177',
-            'testerStreetName': 'Bringelly Road',
-            'testerSuburb': 'Leppington',
-            'testerState': 'NSW',
-            'testerPostCode': '2179',
-            'testerEmail': 'admin@proformelec.com.au',
-            'testerOfficeNo': '47068270',
-            'testerContractorLicenseNo': simpro_data.get('technician_license_number', ''),
-            'testerContractorExpiryDate': simpro_data.get('technician_license_expiry', ''),
-        }
-        
-        # Store session data
-        sessions[session_id] = {
-            'simpro_data': simpro_data,
-            'prefilled_data': prefilled_data,
-            'created_at': datetime.now().isoformat(),
-            'status': 'pending'
-        }
+        session_id = create_session(simpro_data)
         
         # Return form URL
         form_url = f"{request.host_url}form/{session_id}"
@@ -100,6 +469,40 @@ def generate_ccew():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/ccew/webhook', methods=['POST'])
+def ingest_webhook():
+    """Queue a SimPro job-updated webhook; the form session is built in the background"""
+    simpro_data = request.get_json(silent=True)
+    if not isinstance(simpro_data, dict) or not simpro_data.get('job_id'):
+        return jsonify({"success": False, "error": "job_id is required"}), 400
+    
+    job_id = str(simpro_data['job_id'])
+    get_webhook_queue().append(job_id, simpro_data)
+    return jsonify({
+        "success": True,
+        "queued": True,
+        "job_url": f"{request.host_url}api/ccew/job/{job_id}"
+    }), 202
+
+@app.route('/api/ccew/job/<job_id>')
+def get_job_session(job_id):
+    """Look up the form session built for a SimPro job"""
+    session_id = job_sessions.get(job_id)
+    pending = get_webhook_queue().is_pending(job_id)
+    if session_id is None:
+        if pending:
+            return jsonify({"success": True, "pending": True}), 202
+        return jsonify({"success": False, "error": "No CCEW session for this job"}), 404
+    
+    return jsonify({
+        "success": True,
+        "session_id": session_id,
+        "form_url": f"{request.host_url}form/{session_id}",
+        "status": sessions[session_id]['status'],
+        # Newer job updates are still waiting to be applied to the form
+        "pending": pending
+    })
+
 @app.route('/form/<session_id>')
 def show_form(session_id):
     """Display CCEW form for technician to complete"""
@@ -555,19 +958,28 @@ def show_form(session_id):
         </div>
         
         <script>
-            document.getElementById('ccewForm').addEventListener('submit', async (e) => {{
-                e.preventDefault();
-                
-                const submitBtn = document.getElementById('submitBtn');
-                submitBtn.disabled = true;
-                submitBtn.textContent = 'Submitting...';
-                
-                const formData = new FormData(e.target);
+            const form = document.getElementById('ccewForm');
+            const submitBtn = document.getElementById('submitBtn');
+            const MULTI_FIELDS = ['workCarriedOut', 'specialConditions'];
+            const AUTOSAVE_DELAY_MS = 1000;
+            
+            const VALIDATION_RULES = {{{{ rules|tojson }}}};
+            const PREFILLED = {{{{ prefilled|tojson }}}};
+            const DRAFT = {{{{ draft|tojson }}}};
+            const DRAFT_CACHE = 'ccew-drafts';
+            const DRAFT_CACHE_KEY = '/api/ccew/form/{session_id}';
+            let draftVersion = {{{{ draft_version|tojson }}}};
+            let savedDraft = DRAFT;
+            let lastSaved = {{}};
+            let saveTimer = null;
+            let saving = null;
+            
+            function serializeForm() {{
                 const data = {{}};
                 
                 // Handle regular fields
-                for (const [key, value] of formData.entries()) {{
-                    if (key === 'workCarriedOut' || key === 'specialConditions') {{
+                for (const [key, value] of new FormData(form).entries()) {{
+                    if (MULTI_FIELDS.includes(key)) {{
                         if (!data[key]) data[key] = [];
                         data[key].push(value);
                     }} else {{
@@ -576,8 +988,227 @@ def show_form(session_id):
                 }}
                 
                 // Ensure arrays exist even if empty
-                if (!data.workCarriedOut) data.workCarriedOut = [];
-                if (!data.specialConditions) data.specialConditions = [];
+                for (const key of MULTI_FIELDS) {{
+                    if (!data[key]) data[key] = [];
+                }}
+                if (!data.certificationStatement) data.certificationStatement = '';
+                return data;
+            }}
+            
+            function applyDraft(draft) {{
+                for (const [key, value] of Object.entries(draft)) {{
+                    for (const el of form.querySelectorAll(`[name="${{CSS.escape(key)}}"]`)) {{
+                        if (el.readOnly) continue;
+                        if (el.type === 'checkbox') {{
+                            el.checked = Array.isArray(value) ? value.includes(el.value) : value === 'on';
+                        }} else {{
+                            el.value = value;
+                        }}
+                    }}
+                }}
+            }}
+            
+            // Same rules as the server-side validator, compiled once on load
+            const DATE_RE = /^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}$/;
+            const fieldChecks = Object.entries(VALIDATION_RULES).map(([name, rule]) => {{
+                const label = rule.label || name;
+                const pattern = rule.pattern ? new RegExp(`^(?:${{rule.pattern}})$`) : null;
+                
+                if (rule.multiple) {{
+                    return [name, (value) => {{
+                        const items = value ?? [];
+                        if (!Array.isArray(items)) return `${{label}} must be a list`;
+                        if (rule.min_items && items.length < rule.min_items) {{
+                            return `${{label}} requires at least ${{rule.min_items}} selection` + (rule.min_items > 1 ? 's' : '');
+                        }}
+                        for (const item of rule.choices ? items : []) {{
+                            if (typeof item !== 'string') return `${{label}} has an invalid option`;
+                            if (!rule.choices.includes(item)) return `${{label}} has an invalid option: ${{item}}`;
+                        }}
+                        return null;
+                    }}];
+                }}
+                return [name, (value) => {{
+                    if (value == null || (typeof value === 'string' && !value.trim())) {{
+                        return rule.required ? `${{label}} is required` : null;
+                    }}
+                    if (typeof value !== 'string') return `${{label}} must be text`;
+                    const text = value.trim();
+                    if (rule.choices && !rule.choices.includes(text)) {{
+                        return `${{label}} must be one of: ${{[...rule.choices].sort().join(', ')}}`;
+                    }}
+                    if (pattern && !pattern.test(text)) return `${{label}} ${{rule.message || 'is not in a valid format'}}`;
+                    if (rule.date) {{
+                        // Round-trip so impossible dates such as 2024-02-30 fail as they do in Python
+                        if (!DATE_RE.test(text) || isNaN(Date.parse(text)) || new Date(text).toISOString().slice(0, 10) !== text) return `${{label}} must be a date (YYYY-MM-DD)`;
+                        if (rule.not_expired && text < new Date().toLocaleDateString('en-CA')) return `${{label}} has expired`;
+                    }}
+                    return null;
+                }}];
+            }});
+            
+            function validateForm(data) {{
+                const errors = {{}};
+                for (const [name, check] of fieldChecks) {{
+                    const error = check(data[name]);
+                    if (error) errors[name] = error;
+                }}
+                return errors;
+            }}
+            
+            // A checkbox group's error goes on its first box only, so ticking
+            // any box in the group (which clears the group) unblocks submit
+            function showErrors(errors) {{
+                const flagged = new Set();
+                for (const el of form.elements) {{
+                    if (!el.name) continue;
+                    el.setCustomValidity(flagged.has(el.name) ? '' : (errors[el.name] || ''));
+                    flagged.add(el.name);
+                }}
+                const messages = Object.values(errors);
+                if (messages.length) alert('Please fix the following:\\n\\n' + messages.join('\\n'));
+                form.reportValidity();
+            }}
+            
+            // A field the server has never seen counts as empty
+            function sameValue(value, saved) {{
+                if (saved === undefined) return value === '' || (Array.isArray(value) && value.length === 0);
+                return JSON.stringify(value) === JSON.stringify(saved);
+            }}
+            
+            // Only the fields that differ from what the server already holds
+            function changedFields(data) {{
+                const delta = {{}};
+                for (const [key, value] of Object.entries(data)) {{
+                    if (!sameValue(value, lastSaved[key])) {{
+                        delta[key] = value;
+                    }}
+                }}
+                return delta;
+            }}
+            
+            async function saveDraft() {{
+                const data = serializeForm();
+                const fields = changedFields(data);
+                if (Object.keys(fields).length === 0) return;
+                
+                const response = await fetch('/api/ccew/form/{session_id}', {{
+                    method: 'PATCH',
+                    headers: {{'Content-Type': 'application/json'}},
+                    body: JSON.stringify({{version: draftVersion, fields: fields}})
+                }});
+                const result = await response.json();
+                
+                if (response.status === 409 && result.version !== undefined) {{
+                    // Someone else saved first: take their values for fields we
+                    // haven't edited here, then resend only our own changes
+                    const local = serializeForm();
+                    const theirs = {{}};
+                    for (const [key, value] of Object.entries(result.draft)) {{
+                        if (sameValue(local[key], lastSaved[key])) theirs[key] = value;
+                    }}
+                    applyDraft(theirs);
+                    draftVersion = result.version;
+                    savedDraft = result.draft;
+                    lastSaved = {{...lastSaved, ...result.draft}};
+                    return saveDraft();
+                }}
+                if (!result.success) throw new Error(result.error || result.message);
+                
+                draftVersion = result.version;
+                savedDraft = {{...savedDraft, ...fields}};
+                lastSaved = {{...lastSaved, ...fields}};
+                cacheDraft();
+            }}
+            
+            // The offline copy of this page embeds the draft from the last time it
+            // was loaded online, so keep the latest saved draft alongside it
+            function cacheDraft() {{
+                if (!window.caches) return;
+                const body = JSON.stringify({{version: draftVersion, draft: savedDraft}});
+                caches.open(DRAFT_CACHE)
+                    .then((cache) => cache.put(DRAFT_CACHE_KEY, new Response(body)))
+                    .catch((error) => console.warn('Caching draft failed:', error.message));
+            }}
+            
+            async function loadCachedDraft() {{
+                if (!window.caches) return;
+                const response = await (await caches.open(DRAFT_CACHE)).match(DRAFT_CACHE_KEY);
+                const cached = response && await response.json();
+                if (!cached || cached.version <= draftVersion) return;
+                applyDraft(cached.draft);
+                draftVersion = cached.version;
+                savedDraft = cached.draft;
+                lastSaved = {{...PREFILLED, ...cached.draft}};
+            }}
+            
+            function scheduleSave() {{
+                clearTimeout(saveTimer);
+                saveTimer = setTimeout(() => {{
+                    // Chain saves so an older response can never land after a newer one
+                    saving = (saving || Promise.resolve())
+                        .then(saveDraft)
+                        .catch((error) => console.warn('Draft autosave failed:', error.message));
+                }}, AUTOSAVE_DELAY_MS);
+            }}
+            
+            // Cache this page for offline use and queue submissions while offline
+            if ('serviceWorker' in navigator) {{
+                navigator.serviceWorker.register('/sw.js').then(() => {{
+                    if (navigator.onLine) navigator.serviceWorker.controller?.postMessage('replay');
+                }}).catch((error) => console.warn('Service worker registration failed:', error.message));
+                window.addEventListener('online', () => navigator.serviceWorker.controller?.postMessage('replay'));
+                
+                // A queued submission for this form was rejected on replay: put it
+                // back into the form so the technician can fix it and resend
+                navigator.serviceWorker.addEventListener('message', (event) => {{
+                    const message = event.data;
+                    if (message.type !== 'ccew-submission-rejected') return;
+                    if (new URL(message.url).pathname !== '/api/ccew/submit/{session_id}') return;
+                    applyDraft(JSON.parse(message.body));
+                    event.source.postMessage({{type: 'discard', key: message.key}});
+                    if (message.result.errors) {{
+                        showErrors(message.result.errors);
+                    }} else {{
+                        alert('Your queued CCEW could not be sent: ' + (message.result.error || message.result.message));
+                    }}
+                    scheduleSave();
+                }});
+            }}
+            
+            // Seed from what the server holds, not the rendered form, so page
+            // defaults such as the read-only State still get sent
+            applyDraft(DRAFT);
+            lastSaved = {{...PREFILLED, ...DRAFT}};
+            loadCachedDraft().catch((error) => console.warn('Loading cached draft failed:', error.message));
+            function clearError(e) {{
+                if (!e.target.name) return;
+                for (const el of form.querySelectorAll(`[name="${{CSS.escape(e.target.name)}}"]`)) {{
+                    el.setCustomValidity('');
+                }}
+            }}
+            form.addEventListener('input', clearError);
+            form.addEventListener('change', clearError);
+            form.addEventListener('input', scheduleSave);
+            form.addEventListener('change', scheduleSave);
+            
+            form.addEventListener('submit', async (e) => {{
+                e.preventDefault();
+                
+                const errors = validateForm(serializeForm());
+                if (Object.keys(errors).length) {{
+                    showErrors(errors);
+                    return;
+                }}
+                
+                clearTimeout(saveTimer);
+                if (saving) await saving;
+                
+                submitBtn.disabled = true;
+                submitBtn.textContent = 'Submitting...';
+                
+                // The server merges the saved draft, so only send what changed since
+                const data = changedFields(serializeForm());
                 
                 try {{
                     const response = await fetch('/api/ccew/submit/{session_id}', {{
@@ -587,9 +1218,19 @@ def show_form(session_id):
                     }});
                     
                     const result = await response.json();
-                    if (result.success) {{
+                    if (result.queued) {{
+                        if (window.Notification && Notification.permission === 'default') {{
+                            await Notification.requestPermission();
+                        }}
+                        alert('You are offline. The CCEW has been saved on this device and will be sent automatically once you are back online.');
+                        window.location.href = '/success';
+                    }} else if (result.success) {{
                         alert('CCEW submitted successfully! The certificate has been sent to the energy supplier.');
                         window.location.href = '/success';
+                    }} else if (result.errors) {{
+                        showErrors(result.errors);
+                        submitBtn.disabled = false;
+                        submitBtn.textContent = 'Submit CCEW';
                     }} else {{
                         alert('Error: ' + (result.error || result.message));
                         submitBtn.disabled = false;
@@ -606,7 +1247,70 @@ def show_form(session_id):
     </html>
     """
     
-    return render_template_string(html)
+    # Draft values go through Jinja's tojson rather than the f-string so
+    # technician input is escaped and never treated as template source
+    return render_template_string(
+        html,
+        rules=CCEW_CLIENT_RULES,
+        prefilled=prefilled,
+        draft=session_data.get('draft', {}),
+        draft_version=session_data.get('draft_version', 0)
+    )
+
+@app.route('/api/ccew/form/<session_id>', methods=['PATCH'])
+def save_draft(session_id):
+    """Merge changed form fields into the session's saved draft"""
+    try:
+        if session_id not in sessions:
+            return jsonify({"success": False, "error": "Invalid session"}), 404
+        
+        payload = request.get_json(silent=True)
+        fields = payload.get('fields') if isinstance(payload, dict) else None
+        if not isinstance(fields, dict):
+            return jsonify({"success": False, "error": "'fields' must be an object"}), 400
+        
+        errors = check_form_fields(fields)
+        if errors:
+            return jsonify({"success": False, "error": "Invalid draft fields", "errors": errors}), 400
+        
+        with sessions_lock:
+            session_data = sessions[session_id]
+            if session_data['status'] != 'pending':
+                return jsonify({"success": False, "error": "CCEW already submitted"}), 409
+            
+            # Optimistic concurrency: the client must have seen the latest draft
+            if payload.get('version') != session_data['draft_version']:
+                return jsonify({
+                    "success": False,
+                    "error": "Draft version conflict",
+                    "version": session_data['draft_version'],
+                    "draft": session_data['draft']
+                }), 409
+            
+            session_data['draft'].update(fields)
+            session_data['draft_version'] += 1
+            session_data['draft_saved_at'] = datetime.now().isoformat()
+            
+            return jsonify({
+                "success": True,
+                "version": session_data['draft_version']
+            })
+    
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def deliver_ccew(complete_data):
+    """Send the completed CCEW to the energy supplier and return the primary recipient"""
+    # Determine email recipient based on energy provider
+    energy_provider = complete_data.get('energyProvider', '')
+    if energy_provider == 'Ausgrid':
+        primary_email = 'datanorth@ausgrid.com.au'
+    else:
+        primary_email = 'metercrew@finance.nsw.gov.au'
+    
+    # TODO: Generate PDF with complete_data
+    # TODO: Send email to primary_email, meter provider, and owner
+    return primary_email
 
 @app.route('/api/ccew/submit/<session_id>', methods=['POST'])
 def submit_ccew(session_id):
@@ -615,26 +1319,49 @@ def submit_ccew(session_id):
         if session_id not in sessions:
             return jsonify({"success": False, "error": "Invalid session"}), 404
         
-        form_data = request.json
+        form_data = request.get_json(silent=True)
+        if not isinstance(form_data, dict):
+            return jsonify({"success": False, "error": "Request body must be a JSON object"}), 400
         session_data = sessions[session_id]
         
-        # Merge prefilled data with form data
-        complete_data = {**session_data['prefilled_data'], **form_data}
-        
-        # Determine email recipient based on energy provider
-        energy_provider = form_data.get('energyProvider', '')
-        if energy_provider == 'Ausgrid':
-            primary_email = 'datanorth@ausgrid.com.au'
-        else:
-            primary_email = 'metercrew@finance.nsw.gov.au'
+        with sessions_lock:
+            # Queued offline submissions may be replayed more than once, so a
+            # repeat submission returns the original result instead of resending
+            if session_data['status'] == 'completed':
+                return jsonify({
+                    "success": True,
+                    "message": "CCEW already submitted",
+                    "email_sent_to": session_data.get('email_sent_to'),
+                    "duplicate": True
+                })
+            if session_data['status'] == 'submitting':
+                return jsonify({"success": False, "error": "Submission already in progress"}), 409
+            
+            # Merge prefilled data, autosaved draft and the final form delta, then
+            # put back the read-only SimPro/config fields a client can't override
+            prefilled = session_data['prefilled_data']
+            complete_data = {**prefilled, **session_data.get('draft', {}), **form_data}
+            complete_data.update({name: prefilled[name] for name in READ_ONLY_FIELDS if name in prefilled})
+            
+            # Reject bad submissions before the PDF/email/upload steps
+            editable_data = {name: value for name, value in form_data.items() if name not in READ_ONLY_FIELDS}
+            errors = {**validate_ccew(complete_data), **check_form_fields(editable_data)}
+            if errors:
+                return jsonify({"success": False, "error": "Validation failed", "errors": errors}), 400
+            
+            # Claim the session so a concurrent replay can't process it too
+            session_data['status'] = 'submitting'
         
-        # TODO: Generate PDF with complete_data
-        # TODO: Send email to primary_email, meter provider, and owner
+        try:
+            primary_email = deliver_ccew(complete_data)
+        except Exception:
+            session_data['status'] = 'pending'
+            raise
         
-        sessions[session_id]['status'] = 'completed'
-        sessions[session_id]['form_data'] = complete_data
-        sessions[session_id]['completed_at'] = datetime.now().isoformat()
-        sessions[session_id]['email_sent_to'] = primary_email
+        session_data['form_data'] = complete_data
+        session_data['completed_at'] = datetime.now().isoformat()
+        session_data['email_sent_to'] = primary_email
+        session_data['status'] = 'completed'
         
         return jsonify({
             "success": True, 
@@ -645,6 +1372,211 @@ def submit_ccew(session_id):
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Service worker for the technician form. It keeps a copy of each form page
+# (which carries the session's prefilled data and draft) so it can be reopened
+# without signal, and queues submissions in IndexedDB while offline, replaying
+# them via Background Sync or the next time a form page is online. Submissions
+# the server rejects are handed back to their form page rather than dropped.
+SERVICE_WORKER_JS = """
+const CACHE_NAME = 'ccew-forms-v1';
+const DB_NAME = 'ccew-offline';
+const STORE_NAME = 'submissions';
+const SYNC_TAG = 'ccew-submit';
+const SUBMIT_TIMEOUT_MS = 8000;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.add('/success')));
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(self.clients.claim());
+});
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(DB_NAME, 1);
+        req.onupgradeneeded = () => req.result.createObjectStore(STORE_NAME, {autoIncrement: true});
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function withStore(mode, fn) {
+    return openQueue().then((db) => new Promise((resolve, reject) => {
+        const tx = db.transaction(STORE_NAME, mode);
+        const result = fn(tx.objectStore(STORE_NAME));
+        tx.oncomplete = () => resolve(result.result);
+        tx.onerror = () => reject(tx.error);
+    }));
+}
+
+// Keys and entries read together in one transaction so they can't drift apart
+function readQueue() {
+    return openQueue().then((db) => new Promise((resolve, reject) => {
+        const items = [];
+        const tx = db.transaction(STORE_NAME, 'readonly');
+        tx.objectStore(STORE_NAME).openCursor().onsuccess = (event) => {
+            const cursor = event.target.result;
+            if (cursor) {
+                items.push({key: cursor.key, entry: cursor.value});
+                cursor.continue();
+            }
+        };
+        tx.oncomplete = () => resolve(items);
+        tx.onerror = () => reject(tx.error);
+    }));
+}
+
+// Merge changes into an entry unless it has been discarded meanwhile
+function updateEntry(key, changes) {
+    return withStore('readwrite', (store) => {
+        const req = store.get(key);
+        req.onsuccess = () => {
+            if (req.result) store.put({...req.result, ...changes}, key);
+        };
+        return req;
+    });
+}
+
+async function enqueue(url, body) {
+    await withStore('readwrite', (store) => store.add({url: url, body: body, queuedAt: Date.now()}));
+    if (self.registration.sync) {
+        await self.registration.sync.register(SYNC_TAG).catch(() => {});
+    }
+}
+
+function formUrl(submitUrl) {
+    return new URL(submitUrl).pathname.replace('/api/ccew/submit/', '/form/');
+}
+
+// A rejected submission stays queued (but is not retried) until its form page
+// has loaded it back into the form, so the technician can fix and resend it
+async function announceRejected(key, entry) {
+    const clients = await self.clients.matchAll({type: 'window', includeUncontrolled: true});
+    for (const client of clients) {
+        client.postMessage({type: 'ccew-submission-rejected', key: key, url: entry.url, body: entry.body, result: entry.rejected});
+    }
+    if (!entry.notified && self.Notification && Notification.permission === 'granted') {
+        await self.registration.showNotification('CCEW submission rejected', {
+            body: entry.rejected.error || 'Open the form to fix and resend it.',
+            tag: 'ccew-rejected-' + key,
+            data: {url: formUrl(entry.url)}
+        });
+        await updateEntry(key, {notified: true});
+    }
+}
+
+async function drainQueue() {
+    const retried = new Set();
+    while (true) {
+        const next = (await readQueue()).find(({key, entry}) => !entry.rejected && !retried.has(key));
+        if (!next) break;
+
+        const {key, entry} = next;
+        // Network errors propagate so Background Sync retries later
+        const response = await fetch(entry.url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: entry.body
+        });
+        if (response.ok) {
+            await withStore('readwrite', (store) => store.delete(key));
+        } else if (response.status >= 500 || response.status === 409) {
+            // Server trouble, or another copy of this submission is mid-flight
+            retried.add(key);
+        } else {
+            const rejected = await response.json().catch(() => ({error: `HTTP ${response.status}`}));
+            await updateEntry(key, {rejected: rejected});
+        }
+    }
+
+    for (const {key, entry} of await readQueue()) {
+        if (entry.rejected) await announceRejected(key, entry);
+    }
+    if (retried.size) throw new Error('Some queued CCEW submissions will be retried');
+}
+
+// Background Sync and page messages can both ask for a replay; only one runs
+// at a time so the same submission is never posted twice concurrently
+let replaying = null;
+function replayQueue() {
+    if (!replaying) replaying = drainQueue().finally(() => { replaying = null; });
+    return replaying;
+}
+
+async function submitOrQueue(request) {
+    const body = await request.clone().text();
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), SUBMIT_TIMEOUT_MS);
+    try {
+        return await fetch(request, {signal: controller.signal});
+    } catch (error) {
+        // Offline or too slow: the server accepts replays of a completed
+        // submission, so queueing after a timeout can't double-submit
+        await enqueue(request.url, body);
+        return new Response(JSON.stringify({success: true, queued: true}), {
+            status: 202,
+            headers: {'Content-Type': 'application/json'}
+        });
+    } finally {
+        clearTimeout(timer);
+    }
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    try {
+        const response = await fetch(request);
+        if (response.ok) cache.put(request, response.clone());
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+self.addEventListener('fetch', (event) => {
+    const url = new URL(event.request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (event.request.method === 'POST' && url.pathname.startsWith('/api/ccew/submit/')) {
+        event.respondWith(submitOrQueue(event.request));
+    } else if (event.request.method === 'GET' && (url.pathname.startsWith('/form/') || url.pathname === '/success')) {
+        event.respondWith(networkFirst(event.request));
+    }
+});
+
+self.addEventListener('sync', (event) => {
+    if (event.tag === SYNC_TAG) event.waitUntil(replayQueue());
+});
+
+self.addEventListener('message', (event) => {
+    if (event.data === 'replay') {
+        // Fallback for browsers without Background Sync: pages ask for a replay when online
+        event.waitUntil(replayQueue().catch(() => {}));
+    } else if (event.data && event.data.type === 'discard') {
+        // The form page has taken back a rejected submission
+        event.waitUntil(withStore('readwrite', (store) => store.delete(event.data.key)));
+    }
+});
+
+self.addEventListener('notificationclick', (event) => {
+    event.notification.close();
+    event.waitUntil(self.clients.openWindow(event.notification.data.url));
+});
+"""
+
+@app.route('/sw.js')
+def service_worker():
+    """Serve the form service worker from the root so it controls every page"""
+    return Response(
+        SERVICE_WORKER_JS,
+        mimetype='application/javascript',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
 @app.route('/success')
 def success():
     return """
@@ -727,4 +1659,7 @@ def success():
     """
 
 if __name__ == '__main__':
+    # The debug reloader runs this twice; only the serving child owns the queue
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_webhook_queue()
     app.run(host='0.0.0.0', port=5000, debug=True)
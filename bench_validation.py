@@ -0,0 +1,58 @@
+"""Microbenchmark for the compiled CCEW submission validator.
+
+Run with: python bench_validation.py
+"""
+import timeit
+
+from app import validate_ccew
+
+VALID_SUBMISSION = {
+    'serialNo': '12345',
+    'propertyName': '1 Example Street, Leppington NSW 2179',
+    'streetNumber': '1',
+    'streetName': 'Example Street',
+    'suburb': 'Leppington',
+    'state': 'NSW',
+    'postCode': '2179',
+    'nmi': '4103123456',
+    'aemoMeteringProviderId': 'ACTVMP',
+    'customerFirstName': 'Jane',
+    'customerLastName': 'Citizen',
+    'customerStreetNumber': '1',
+    'customerStreetName': 'Example Street',
+    'customerSuburb': 'Leppington',
+    'customerState': 'NSW',
+    'customerPostCode': '2179',
+    'customerEmail': 'jane@example.com',
+    'installationType': 'Residential',
+    'workCarriedOut': ['New Work', 'EV Connection'],
+    'specialConditions': [],
+    'installerContractorExpiryDate': '2099-02-02',
+    'testerFirstName': 'Sam',
+    'testerLastName': 'Sparky',
+    'testerContractorLicenseNo': '123456C',
+    'testerContractorExpiryDate': '2099-01-01',
+    'testCompletedDate': '2026-01-01',
+    'energyProvider': 'Ausgrid',
+    'ownerEmail': 'owner@example.com',
+    'certificationStatement': 'on',
+}
+
+INVALID_SUBMISSION = {
+    **VALID_SUBMISSION,
+    'postCode': '21790',
+    'nmi': 'abc',
+    'workCarriedOut': [],
+    'testerContractorExpiryDate': '2020-01-01',
+    'ownerEmail': 'not-an-email',
+    'certificationStatement': '',
+}
+
+def bench(name, data, number=20000):
+    assert bool(validate_ccew(data)) == (data is INVALID_SUBMISSION)
+    best = min(timeit.repeat(lambda: validate_ccew(data), number=number, repeat=5))
+    print(f"{name}: {best / number * 1e6:.2f} us per submission")
+
+if __name__ == '__main__':
+    bench('valid', VALID_SUBMISSION)
+    bench('invalid', INVALID_SUBMISSION)
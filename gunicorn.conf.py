@@ -0,0 +1,7 @@
+# Loaded automatically by gunicorn from the working directory (see Procfile)
+
+def post_worker_init(worker):
+    # Replay webhook events queued before a restart without waiting for the
+    # next webhook; importing app alone deliberately starts nothing
+    from app import start_webhook_queue
+    start_webhook_queue()
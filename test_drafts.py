@@ -0,0 +1,61 @@
+"""Tests for draft autosave via PATCH /api/ccew/form/<session_id>.
+
+Run with: python -m pytest -q
+"""
+import pytest
+
+from app import app, sessions
+from test_validation import EDITABLE_FIELDS, SIMPRO_JOB
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+@pytest.fixture
+def session_id(client):
+    return client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+
+def patch(client, session_id, version, fields):
+    return client.patch(f'/api/ccew/form/{session_id}', json={'version': version, 'fields': fields})
+
+def test_saves_merge_into_draft(client, session_id):
+    assert patch(client, session_id, 0, {'suburb': 'Leppington', 'postCode': '2179'}).json['version'] == 1
+    assert patch(client, session_id, 1, {'postCode': '2000', 'workCarriedOut': ['New Work']}).json['version'] == 2
+    assert sessions[session_id]['draft'] == {'suburb': 'Leppington', 'postCode': '2000', 'workCarriedOut': ['New Work']}
+
+def test_stale_version_returns_current_draft(client, session_id):
+    patch(client, session_id, 0, {'suburb': 'Leppington'})
+    response = patch(client, session_id, 0, {'suburb': 'Other'})
+    assert response.status_code == 409
+    assert response.json['version'] == 1
+    assert response.json['draft'] == {'suburb': 'Leppington'}
+
+def test_patch_after_completion_rejected(client, session_id):
+    patch(client, session_id, 0, EDITABLE_FIELDS)
+    assert client.post(f'/api/ccew/submit/{session_id}', json={}).status_code == 200
+    response = patch(client, session_id, 1, {'suburb': 'Other'})
+    assert response.status_code == 409
+    assert sessions[session_id]['draft']['suburb'] == EDITABLE_FIELDS['suburb']
+
+@pytest.mark.parametrize('fields', [
+    {'installerContractorLicenseNo': 'FAKE'},
+    {'serialNo': '999'},
+    {'notAField': 'x'},
+    {'suburb': {'nested': 'value'}},
+    {'suburb': 42},
+    {'workCarriedOut': 'New Work'},
+    {'workCarriedOut': [['New Work']]},
+])
+def test_rejects_read_only_unknown_and_mistyped_fields(client, session_id, fields):
+    response = patch(client, session_id, 0, fields)
+    assert response.status_code == 400
+    assert set(response.json['errors']) == set(fields)
+    assert sessions[session_id]['draft_version'] == 0
+
+@pytest.mark.parametrize('kwargs', [
+    {'data': 'not json', 'content_type': 'text/plain'},
+    {'json': ['suburb']},
+    {'json': {'version': 0, 'fields': ['suburb']}},
+])
+def test_malformed_payload_is_400(client, session_id, kwargs):
+    assert client.patch(f'/api/ccew/form/{session_id}', **kwargs).status_code == 400
@@ -0,0 +1,51 @@
+"""Tests for the CCEW submit endpoint's handling of replayed submissions.
+
+Run with: python -m pytest -q
+"""
+import pytest
+
+import app as ccew_app
+from app import app, sessions
+from test_validation import EDITABLE_FIELDS, SIMPRO_JOB
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+@pytest.fixture
+def session_id(client):
+    session_id = client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+    client.patch(f'/api/ccew/form/{session_id}', json={'version': 0, 'fields': EDITABLE_FIELDS})
+    return session_id
+
+def submit(client, session_id, data=None):
+    return client.post(f'/api/ccew/submit/{session_id}', json=data or {})
+
+def test_replay_of_completed_submission_is_duplicate(client, session_id):
+    first = submit(client, session_id)
+    assert first.status_code == 200 and 'duplicate' not in first.json
+
+    replay = submit(client, session_id, {'suburb': 'Somewhere Else'})
+    assert replay.status_code == 200
+    assert replay.json['duplicate'] is True
+    assert replay.json['email_sent_to'] == first.json['email_sent_to']
+    assert sessions[session_id]['form_data']['suburb'] == EDITABLE_FIELDS['suburb']
+
+def test_submission_in_progress_is_409(client, session_id):
+    sessions[session_id]['status'] = 'submitting'
+    response = submit(client, session_id)
+    assert response.status_code == 409
+    assert sessions[session_id]['status'] == 'submitting'
+
+def test_failed_delivery_returns_session_to_pending(client, session_id, monkeypatch):
+    def fail(complete_data):
+        raise RuntimeError('SMTP unavailable')
+    monkeypatch.setattr(ccew_app, 'deliver_ccew', fail)
+
+    response = submit(client, session_id)
+    assert response.status_code == 500
+    assert sessions[session_id]['status'] == 'pending'
+
+    monkeypatch.undo()
+    assert submit(client, session_id).status_code == 200
+    assert sessions[session_id]['status'] == 'completed'
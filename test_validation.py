@@ -0,0 +1,120 @@
+"""Tests for the compiled CCEW validator and its browser counterpart.
+
+Run with: python -m pytest -q
+"""
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from app import (app, build_prefilled_data, sessions, validate_ccew,
+                 INSTALLER_CONTRACTOR_EXPIRY_DATE, INSTALLER_CONTRACTOR_LICENSE_NO)
+from bench_validation import VALID_SUBMISSION
+
+EDITABLE_FIELDS = {
+    'streetNumber': '1', 'streetName': 'Example Street', 'suburb': 'Leppington', 'postCode': '2179',
+    'aemoMeteringProviderId': 'ACTVMP', 'customerStreetNumber': '1', 'customerStreetName': 'Example Street',
+    'customerSuburb': 'Leppington', 'customerState': 'NSW', 'customerPostCode': '2179',
+    'installationType': 'Residential', 'workCarriedOut': ['New Work'], 'testerContractorLicenseNo': '123456C',
+    'testerContractorExpiryDate': '2099-01-01', 'testCompletedDate': '2026-01-01',
+    'energyProvider': 'Ausgrid', 'certificationStatement': 'on',
+}
+
+SIMPRO_JOB = {
+    'job_id': 12345, 'site_address': '1 Example Street', 'customer_first_name': 'Jane',
+    'customer_last_name': 'Citizen', 'technician_name': 'Sam Sparky',
+}
+
+def test_valid_submission_has_no_errors():
+    assert validate_ccew(VALID_SUBMISSION) == {}
+
+def test_all_errors_reported_at_once():
+    errors = validate_ccew({**VALID_SUBMISSION, 'postCode': '21790', 'nmi': 'abc', 'ownerEmail': 'nope'})
+    assert set(errors) == {'postCode', 'nmi', 'ownerEmail'}
+
+def test_prefill_supplies_read_only_state():
+    data = {**build_prefilled_data(SIMPRO_JOB), **EDITABLE_FIELDS}
+    assert 'state' not in validate_ccew(data)
+    assert validate_ccew({k: v for k, v in data.items() if k != 'state'})['state'] == 'State is required'
+
+def test_work_carried_out_must_be_non_empty_list():
+    assert 'must be a list' in validate_ccew({**VALID_SUBMISSION, 'workCarriedOut': 'New Work'})['workCarriedOut']
+    assert 'at least 1' in validate_ccew({**VALID_SUBMISSION, 'workCarriedOut': []})['workCarriedOut']
+
+@pytest.mark.parametrize('value', ['2024-02-30', '2024-13-01', '01/02/2024', '2024-2-1'])
+def test_invalid_calendar_dates_rejected(value):
+    assert validate_ccew({**VALID_SUBMISSION, 'testCompletedDate': value})['testCompletedDate'] == \
+        'Test Completion Date must be a date (YYYY-MM-DD)'
+
+def test_expired_tester_licence_rejected():
+    errors = validate_ccew({**VALID_SUBMISSION, 'testerContractorExpiryDate': '2020-01-01'})
+    assert errors == {'testerContractorExpiryDate': 'Tester License Expiry Date has expired'}
+
+@pytest.mark.parametrize('field, value, error', [
+    ('workCarriedOut', [['New Work']], 'Work Carried Out has an invalid option'),
+    ('workCarriedOut', [{'work': 'New Work'}], 'Work Carried Out has an invalid option'),
+    ('specialConditions', [None], 'Special Conditions has an invalid option'),
+    ('installationType', {'type': 'Residential'}, 'Type of Installation must be text'),
+    ('installationType', ['Residential'], 'Type of Installation must be text'),
+])
+def test_non_text_choices_rejected(field, value, error):
+    assert validate_ccew({**VALID_SUBMISSION, field: value})[field] == error
+
+def test_non_text_choices_are_400_on_submit():
+    client = app.test_client()
+    session_id = client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+    client.patch(f'/api/ccew/form/{session_id}', json={'version': 0, 'fields': EDITABLE_FIELDS})
+    response = client.post(f'/api/ccew/submit/{session_id}', json={'workCarriedOut': [['New Work']]})
+    assert response.status_code == 400
+    assert 'workCarriedOut' in response.json['errors']
+
+def test_read_only_fields_cannot_be_overridden_on_submit():
+    client = app.test_client()
+    session_id = client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+    client.patch(f'/api/ccew/form/{session_id}', json={'version': 0, 'fields': EDITABLE_FIELDS})
+    response = client.post(f'/api/ccew/submit/{session_id}', json={
+        'installerContractorLicenseNo': 'FAKE', 'installerContractorExpiryDate': '2001-01-01',
+        'serialNo': '999', 'state': 'VIC',
+    })
+    assert response.status_code == 200, response.json
+    stored = sessions[session_id]['form_data']
+    assert stored['installerContractorLicenseNo'] == INSTALLER_CONTRACTOR_LICENSE_NO
+    assert stored['installerContractorExpiryDate'] == INSTALLER_CONTRACTOR_EXPIRY_DATE
+    assert stored['serialNo'] == str(SIMPRO_JOB['job_id'])
+    assert stored['state'] == 'NSW'
+
+@pytest.mark.parametrize('body', [['suburb'], 'text'])
+def test_non_object_submit_body_is_400(body):
+    client = app.test_client()
+    session_id = client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+    assert client.post(f'/api/ccew/submit/{session_id}', json=body).status_code == 400
+
+def test_submit_with_autosaved_draft_and_empty_delta():
+    client = app.test_client()
+    session_id = client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+    assert client.patch(f'/api/ccew/form/{session_id}', json={'version': 0, 'fields': EDITABLE_FIELDS}).status_code == 200
+    response = client.post(f'/api/ccew/submit/{session_id}', json={})
+    assert response.status_code == 200, response.json
+
+PARITY_CASES = [
+    VALID_SUBMISSION,
+    {**VALID_SUBMISSION, 'postCode': '21790', 'nmi': 'abc', 'customerEmail': 'a@b', 'workCarriedOut': []},
+    {**VALID_SUBMISSION, 'testCompletedDate': '2024-02-30', 'testerContractorExpiryDate': '2020-01-01'},
+    {**VALID_SUBMISSION, 'installationType': 'House', 'specialConditions': ['Nope'], 'state': '  '},
+    {**VALID_SUBMISSION, 'workCarriedOut': [['New Work']], 'specialConditions': 'Hazardous Area'},
+    {**VALID_SUBMISSION, 'installationType': {'type': 'Residential'}, 'suburb': 42, 'nmi': None},
+    {},
+]
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_browser_checks_match_server():
+    client = app.test_client()
+    session_id = client.post('/api/ccew/generate', json=SIMPRO_JOB).json['session_id']
+    page = client.get(f'/form/{session_id}').data.decode()
+    rules = page.split('const VALIDATION_RULES = ', 1)[1].split(';\n', 1)[0]
+    checks = page[page.index('const DATE_RE'):page.index('function showErrors')]
+    script = (f"const VALIDATION_RULES = {rules};\n{checks}\n"
+              f"console.log(JSON.stringify({json.dumps(PARITY_CASES)}.map(validateForm)));")
+    result = subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout) == [validate_ccew(case) for case in PARITY_CASES]
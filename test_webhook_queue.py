@@ -0,0 +1,111 @@
+"""Tests for the coalescing SimPro webhook queue.
+
+Run with: python -m pytest -q
+"""
+import json
+import threading
+import time
+
+import pytest
+
+import app as ccew_app
+from app import WebhookQueue
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out waiting for condition')
+        time.sleep(0.005)
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, job_id, payload):
+        self.calls.append((job_id, payload))
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / 'webhook_queue.jsonl')
+
+def test_burst_coalesces_to_latest_payload_per_job(queue_path):
+    handler = Recorder()
+    queue = WebhookQueue(queue_path, handler, debounce_seconds=0.1)
+    for i in range(10):
+        queue.append('1', {'job_id': 1, 'rev': i})
+    for i in range(3):
+        queue.append('2', {'job_id': 2, 'rev': i})
+
+    wait_for(lambda: len(handler.calls) == 2)
+    time.sleep(0.2)
+    assert sorted(handler.calls, key=lambda call: call[0]) == [('1', {'job_id': 1, 'rev': 9}), ('2', {'job_id': 2, 'rev': 2})]
+
+def test_max_delay_caps_a_continuously_updated_job(queue_path):
+    handler = Recorder()
+    queue = WebhookQueue(queue_path, handler, debounce_seconds=0.2, max_delay_seconds=0.3)
+    start = time.monotonic()
+    rev = 0
+    while not handler.calls:
+        assert time.monotonic() - start < 2, 'max_delay never fired'
+        queue.append('1', {'job_id': 1, 'rev': rev})
+        rev += 1
+        time.sleep(0.02)
+    # Events kept arriving faster than the debounce window, so only the cap could fire
+    assert 0.25 <= time.monotonic() - start < 1.0
+
+def test_recovers_events_skipping_bad_and_torn_lines(queue_path):
+    with open(queue_path, 'w') as f:
+        f.write('{"foo": 1}\n[1, 2]\nnot json\n')
+        f.write(json.dumps({'job_id': '3', 'payload': {'job_id': 3, 'rev': 'old'}}) + '\n')
+        f.write(json.dumps({'job_id': '3', 'payload': {'job_id': 3, 'rev': 'new'}}) + '\n')
+        f.write('{"job_id": "4", "pay')
+    handler = Recorder()
+    queue = WebhookQueue(queue_path, handler, debounce_seconds=0.05)
+    wait_for(lambda: handler.calls)
+    assert handler.calls == [('3', {'job_id': 3, 'rev': 'new'})]
+
+def test_append_after_torn_line_starts_a_new_line(queue_path):
+    with open(queue_path, 'w') as f:
+        f.write('{"job_id": "4", "pay')
+    queue = WebhookQueue(queue_path, Recorder(), debounce_seconds=60)
+    queue.append('5', {'job_id': 5})
+    with open(queue_path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == '{"job_id": "4", "pay'
+    assert json.loads(lines[1]) == {'job_id': '5', 'payload': {'job_id': 5}}
+
+def test_file_emptied_only_once_nothing_is_pending(queue_path):
+    release = threading.Event()
+    handled = []
+
+    def handler(job_id, payload):
+        handled.append(job_id)
+        if job_id == '2':
+            release.wait(3)
+
+    queue = WebhookQueue(queue_path, handler, debounce_seconds=0.1)
+    queue.append('1', {'job_id': 1})
+    time.sleep(0.05)
+    queue.append('2', {'job_id': 2})
+
+    wait_for(lambda: '1' in handled)
+    with open(queue_path) as f:
+        assert len(f.read().splitlines()) == 2
+
+    release.set()
+    wait_for(lambda: '2' in handled)
+    wait_for(lambda: open(queue_path).read() == '')
+    assert not queue.is_pending('2')
+
+def test_start_only_creates_queue_when_file_has_events(queue_path, monkeypatch):
+    monkeypatch.setenv('WEBHOOK_QUEUE_PATH', queue_path)
+    monkeypatch.setattr(ccew_app, 'webhook_queue', None)
+    ccew_app.start_webhook_queue()
+    assert ccew_app.webhook_queue is None
+
+    with open(queue_path, 'w') as f:
+        f.write(json.dumps({'job_id': '8', 'payload': {'job_id': 8}}) + '\n')
+    ccew_app.start_webhook_queue()
+    assert ccew_app.webhook_queue is not None
+    assert ccew_app.webhook_queue.is_pending('8')